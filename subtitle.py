@@ -12,8 +12,18 @@ import os
 import sys
 import shutil
 import platform
+import hashlib
+import tempfile
+import collections
+import importlib.util
+import re
+import wave
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
 
 # ==========================================
 # 👇 【使用者設定區域】請在此修改設定
@@ -25,8 +35,12 @@ INPUT_DIR = 'video'
 # 輸出字幕的資料夾
 OUTPUT_DIR = 'subtitle'
 
-# 模型檔案路徑 (例如: ggml-large-v3.bin)
-MODEL_PATH = 'ggml-large-v3.bin'
+# 模型檔案路徑 (建議使用量化模型，CPU 上速度約快兩倍、記憶體用量減半)
+# 產生方式: ./quantize ggml-large-v3.bin ggml-large-v3-q4_0.bin q4_0
+MODEL_PATH = 'ggml-large-v3-q4_0.bin'
+
+# 找不到 MODEL_PATH 時依序嘗試的模型檔案
+FALLBACK_MODEL_PATHS = ['ggml-large-v3.bin']
 
 # whisper.cpp 的執行檔名稱 (Windows 通常是 main.exe，Mac/Linux 是 main)
 # 如果執行檔不在同目錄，請填寫完整路徑
@@ -35,6 +49,70 @@ WHISPER_EXEC_NAME = 'main'
 # 支援的影片格式
 SUPPORTED_EXTENSIONS = {'.mp4', '.mov', '.m4a', '.mp3', '.mkv', '.wav', '.webm', '.flv'}
 
+# 辨識引擎 (也可用環境變數 SUBTITLE_BACKEND 指定)
+# 'cli'            : 呼叫 whisper.cpp 執行檔 (可使用 CUDA 版執行檔)
+# 'pywhispercpp'   : 透過 Python binding 在程式內只載入一次模型，省下每次啟動行程與載入模型
+#                    (需 pip install pywhispercpp)
+# 'faster-whisper' : CTranslate2 INT8 量化模型 + 批次推論，GPU 上特別快
+#                    (需 pip install faster-whisper，不使用 MODEL_PATH 的 ggml 模型)
+WHISPER_BACKEND = os.environ.get('SUBTITLE_BACKEND', 'cli')
+
+# faster-whisper 的模型名稱 (或已轉換的 CTranslate2 模型目錄) 與批次推論大小
+FASTER_WHISPER_MODEL = 'large-v3'
+FASTER_WHISPER_BATCH_SIZE = 8
+
+# 每次呼叫 whisper.cpp 處理的檔案數 (模型只需載入一次，可省下大量載入時間)
+WHISPER_BATCH_SIZE = 32
+
+# 同時執行的 whisper.cpp 行程數
+WHISPER_WORKERS = 2
+
+# 每個 whisper.cpp 行程使用的執行緒總數 (CPU 核心平均分給各行程，避免超額使用)
+WHISPER_THREADS = max(1, (os.cpu_count() or 4) // WHISPER_WORKERS)
+
+# 長音檔切成幾段平行辨識 (whisper.cpp 的 -p 參數，模型只載入一次)
+# 切段處會損失上下文，因此只套用在長度超過門檻 (秒) 的檔案
+WHISPER_PROCESSORS = 4
+PARALLEL_MIN_DURATION = 10 * 60
+
+# 解碼設定 (三種辨識引擎都適用)：beam size / best-of 設為 1 約可省下一半解碼運算，辨識率僅略降
+# 重視品質時可改回 whisper.cpp 預設的 5 / 5
+BEAM_SIZE = 1
+BEST_OF = 1
+
+# 關閉溫度回退重試 (困難段落的重試可能讓解碼運算增加數倍)
+NO_FALLBACK = True
+
+# 音頻濾鏡：濾除低頻噪音與高頻干擾後做音量標準化
+# dynaudnorm 比單次 loudnorm 輕量許多；若仍嫌慢可只保留 highpass/lowpass
+# (whisper 本身會對 log-mel 特徵做標準化)
+AUDIO_FILTERS = 'highpass=f=80,lowpass=f=8000,dynaudnorm=f=500:g=15'
+
+# 靜音裁剪：辨識前先移除靜音段落以減少 whisper 運算量，字幕時間軸會自動對回原始影片
+SILENCE_TRIM = True
+SILENCE_NOISE = '-30dB'       # 低於此音量視為靜音
+SILENCE_MIN_DURATION = 0.5    # 持續超過此秒數才算靜音段落
+SPEECH_PADDING = 0.2          # 語音段落前後保留的秒數，避免切掉字首字尾
+
+# 暫存音頻的位置，預設為系統暫存目錄 (通常位於較快的本機磁碟或 tmpfs，
+# 輸出資料夾在網路磁碟上時特別有幫助)；記憶體不足時可改為硬碟路徑
+# 也可用環境變數 SUBTITLE_TMPDIR 指定
+TEMP_DIR = os.environ.get('SUBTITLE_TMPDIR') or tempfile.gettempdir()
+
+# 轉檔後的 WAV 快取，重新執行時可跳過 ffmpeg；超過容量上限時先刪除最久未使用的檔案
+# ffmpeg 轉檔實際寫入的是這個目錄 (TEMP_DIR 只放裁剪靜音後的複本)，需要加速轉檔時
+# 應把它指到較快的磁碟或 tmpfs (tmpfs 容量有限時請一併調低 WAV_CACHE_LIMIT)
+# 也可用環境變數 SUBTITLE_CACHEDIR 指定，預設為使用者的快取目錄
+WAV_CACHE_DIR = os.environ.get('SUBTITLE_CACHEDIR') or os.path.join(
+    os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+    'subtitle', 'wav')
+WAV_CACHE_LIMIT = 5 * 1024 ** 3  # bytes
+
+# 小於此大小 (bytes) 的檔案每 EXTRACT_GROUP_SIZE 個合併成一次 ffmpeg 呼叫轉檔，
+# 大量短片段時可省下逐檔啟動 ffmpeg 的時間
+SMALL_FILE_SIZE = 50 * 1024 ** 2
+EXTRACT_GROUP_SIZE = 16
+
 PROMPT_TEXT = '以下內容為資訊工程學系「資料結構與演算法」課程的上課錄影逐字稿，使用繁體中文。課程以中文授課，但遇到專有名詞、資料結構、演算法名稱與技術術語時請保留英文原文，不要音譯或自行翻譯，並正確轉寫。'
 
 # ==========================================
@@ -48,21 +126,49 @@ try:
 except ImportError:
     TQDM_AVAILABLE = False
 
-# 全域變數用來儲存確認過的執行檔路徑
+# 全域變數用來儲存確認過的執行檔與模型路徑
 VALID_WHISPER_PATH = ""
-
-def check_dependencies() -> Optional[str]:
-    """
-    檢查必要的依賴是否存在
-    Returns: None if success, error message string if failed
-    """
-    global VALID_WHISPER_PATH
-
-    # 1. 檢查 ffmpeg
-    if not shutil.which('ffmpeg'):
-        return "❌ 找不到 ffmpeg，請確保已安裝並加入系統環境變數 PATH 中。"
-    
-    # 2. 檢查 whisper.cpp 執行檔
+VALID_MODEL_PATH = ""
+
+# 程式內辨識引擎載入的模型池 (整個執行過程共用，多張 GPU 時每張各一個模型)
+WHISPER_MODELS: queue.Queue = queue.Queue()
+
+# 掃描檔案時比對用的小寫副檔名 (設定中寫成大寫也能比對)
+SUPPORTED_EXTENSIONS_LOWER = frozenset(ext.lower() for ext in SUPPORTED_EXTENSIONS)
+
+# Windows 下避免每個 ffmpeg / whisper.cpp 子行程都跳出主控台視窗
+SUBPROCESS_FLAGS = subprocess.CREATE_NO_WINDOW if platform.system() == "Windows" else 0
+
+# 佇列中與辨識中的工作仍在使用的快取 WAV (路徑: 使用次數)，清理快取時略過
+# 提取執行緒與主執行緒共用，以鎖保護
+WAV_CACHE_LOCK = threading.Lock()
+WAV_CACHE_IN_USE: collections.Counter = collections.Counter()
+
+# 子行程失敗時顯示的 stderr 行數 (只保留最後幾行，不累積整個輸出)
+STDERR_TAIL_LINES = 20
+
+@dataclass
+class AudioJob:
+    """一個已提取音頻、等待辨識的檔案"""
+    video_path: Path
+    wav_path: Path
+    target_srt_path: Path
+    # 裁剪靜音後保留的語音段落 (原始時間軸的秒數)，None 表示未裁剪
+    speech_segments: Optional[List[Tuple[float, float]]] = None
+    # wav_path 是否為暫存檔 (原始 WAV 與快取檔不可刪除)
+    temporary: bool = True
+    # 辨識時仍需使用的快取 WAV，完成後釋放讓 prune_wav_cache 可以清理
+    cache_wav: Optional[Path] = None
+
+    @property
+    def output_srt_path(self) -> Path:
+        """辨識結果的字幕位置：裁剪過的音頻先輸出到暫存目錄，時間軸還原後才搬到目標位置"""
+        if self.speech_segments:
+            return self.wav_path.with_suffix('.srt')
+        return self.target_srt_path
+
+def find_whisper_exec() -> Optional[str]:
+    """尋找 whisper.cpp 執行檔，找不到時回傳 None"""
     target_exec = WHISPER_EXEC_NAME
     
     # Windows 自動補全 .exe (如果使用者沒寫)
@@ -80,105 +186,679 @@ def check_dependencies() -> Optional[str]:
         if Path(cand).resolve().is_file():
             found_exec = str(Path(cand).resolve())
             break
-            
-    if not found_exec:
-        return f"❌ 找不到 whisper.cpp 執行檔: {WHISPER_EXEC_NAME}"
+
+    return found_exec
+
+def check_dependencies() -> Optional[str]:
+    """
+    檢查必要的依賴是否存在
+    Returns: None if success, error message string if failed
+    """
+    global VALID_WHISPER_PATH, VALID_MODEL_PATH
+
+    # 1. 檢查 ffmpeg
+    if not shutil.which('ffmpeg'):
+        return "❌ 找不到 ffmpeg，請確保已安裝並加入系統環境變數 PATH 中。"
     
-    VALID_WHISPER_PATH = found_exec
+    # 2. 檢查辨識引擎
+    if WHISPER_BACKEND == 'cli':
+        VALID_WHISPER_PATH = find_whisper_exec() or ""
+        if not VALID_WHISPER_PATH:
+            return f"❌ 找不到 whisper.cpp 執行檔: {WHISPER_EXEC_NAME}"
+    elif WHISPER_BACKEND == 'pywhispercpp':
+        if importlib.util.find_spec('pywhispercpp') is None:
+            return "❌ 找不到 pywhispercpp，請執行 pip install pywhispercpp"
+    elif WHISPER_BACKEND == 'faster-whisper':
+        if importlib.util.find_spec('faster_whisper') is None:
+            return "❌ 找不到 faster-whisper，請執行 pip install faster-whisper"
+        # faster-whisper 使用自己的模型格式，不需要 ggml 模型檔
+        return None
+    else:
+        return f"❌ 不支援的辨識引擎: {WHISPER_BACKEND}"
 
-    # 3. 檢查模型檔案
-    if not Path(MODEL_PATH).is_file():
+    # 3. 檢查模型檔案 (優先使用量化模型)
+    for cand in [MODEL_PATH, *FALLBACK_MODEL_PATHS]:
+        if Path(cand).is_file():
+            VALID_MODEL_PATH = cand
+            break
+    else:
         return f"❌ 找不到模型檔案: {MODEL_PATH}"
-    
+
+    if VALID_MODEL_PATH != MODEL_PATH:
+        print(f"⚠️ 找不到 {MODEL_PATH}，改用 {VALID_MODEL_PATH}")
+
     return None
 
-def extract_audio(input_file: Path, output_wav: Path) -> bool:
-    """使用 ffmpeg 提取並優化音頻"""
+def walk_files(root: str) -> Iterator[os.DirEntry]:
+    """遞迴列出所有檔案，沿用 DirEntry 快取的檔案類型，不需額外 stat"""
+    # 與 os.walk 相同，略過無法讀取的目錄而不是中斷整個掃描
+    try:
+        scanner = os.scandir(root)
+    except OSError:
+        return
+
+    with scanner as entries:
+        while True:
+            try:
+                entry = next(entries)
+            except StopIteration:
+                break
+            except OSError:
+                return
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path)
+            elif entry.is_file():
+                yield entry
+
+def collect_video_files(input_root: Path, output_root: Path) -> List[Tuple[Path, Path, int]]:
+    """掃描輸入目錄，回傳尚未生成字幕的 (影片路徑, 目標字幕路徑, 檔案大小)"""
+    # 全部使用字串處理路徑，避免每個檔案建立多個 Path 物件
+    prefix_len = len(os.path.join(str(input_root), ''))
+    srt_root = os.path.abspath(output_root)
+
+    # 一次列出已存在的字幕，之後以集合查詢取代逐檔 stat
+    # (normcase 讓 Windows 上的大小寫差異不影響比對)
+    existing_srts = set()
+    if os.path.isdir(srt_root):
+        srt_prefix_len = len(os.path.join(srt_root, ''))
+        existing_srts = {
+            os.path.normcase(entry.path[srt_prefix_len:])
+            for entry in walk_files(srt_root)
+            if entry.name.lower().endswith('.srt')
+        }
+
+    tasks = []
+    for entry in walk_files(str(input_root)):
+        # 直接切檔名字串比對副檔名；開頭的點 (隱藏檔) 不算副檔名
+        name = entry.name
+        dot = name.rfind('.')
+        if dot <= 0 or name[dot:].lower() not in SUPPORTED_EXTENSIONS_LOWER:
+            continue
+        stem = name[:dot]
+        # 檢查是否已存在字幕
+        rel_srt = os.path.join(os.path.dirname(entry.path[prefix_len:]), stem + '.srt')
+        if os.path.normcase(rel_srt) in existing_srts:
+            continue
+        # 檔案大小只在掃描時取一次 (Windows 上 DirEntry 已快取)，排序與分組都沿用
+        try:
+            size = entry.stat().st_size
+        except OSError:
+            continue
+        tasks.append((Path(entry.path), Path(srt_root, rel_srt), size))
+
+    return tasks
+
+def ffmpeg_error_tail(stderr: bytes) -> str:
+    """取 ffmpeg 輸出的最後幾行作為錯誤訊息，略過 info 等級的靜音偵測結果"""
+    lines = [
+        line for line in stderr.decode('utf-8', errors='ignore').splitlines()
+        if not line.startswith('[silencedetect')
+    ]
+    return '\n'.join(lines[-STDERR_TAIL_LINES:])
+
+def silence_filter() -> str:
+    """ffmpeg silencedetect 濾鏡設定"""
+    return f'silencedetect=noise={SILENCE_NOISE}:d={SILENCE_MIN_DURATION}'
+
+def extract_audio(input_file: Path, output_wav: Path) -> Optional[str]:
+    """使用 ffmpeg 提取並優化音頻，成功時回傳 ffmpeg 的訊息輸出，失敗時回傳 None"""
+    filters = AUDIO_FILTERS
+    if SILENCE_TRIM:
+        # silencedetect 不會改變音訊，在同一次轉檔中順便偵測靜音，省下重新讀取 WAV
+        # 時間戳先歸零，偵測到的時間才會對應 WAV 的取樣位置
+        filters += ',asetpts=PTS-STARTPTS,' + silence_filter()
+
     cmd = [
-        'ffmpeg', '-y', 
-        '-v', 'error',         # 減少輸出訊息
+        'ffmpeg', '-y', '-hide_banner', '-nostats',
+        '-v', 'info' if SILENCE_TRIM else 'error',  # 偵測靜音時需要 info 等級的輸出
         '-i', str(input_file),
         '-ar', '16000',        # 採樣率
         '-ac', '1',            # 單聲道
         '-c:a', 'pcm_s16le',   # 16-bit
-        '-af', 'loudnorm,highpass=f=80,lowpass=f=8000', # 濾鏡
+        '-af', filters,        # 濾鏡
         str(output_wav)
     ]
-    
+
+    try:
+        proc = subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                              creationflags=SUBPROCESS_FLAGS)
+        return proc.stderr.decode('utf-8', errors='ignore')
+    except subprocess.CalledProcessError as e:
+        print(f"  ❌ FFmpeg 錯誤: {ffmpeg_error_tail(e.stderr)}")
+        return None
+
+def wav_cache_path(input_file: Path) -> Path:
+    """依檔案路徑、大小、修改時間與濾鏡設定計算快取檔位置"""
+    stat = input_file.stat()
+    key_source = f"{input_file.resolve()}:{stat.st_size}:{stat.st_mtime_ns}:{AUDIO_FILTERS}"
+    key = hashlib.blake2b(key_source.encode('utf-8')).hexdigest()[:16]
+
+    cache_dir = Path(WAV_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / f"{key}.wav"
+
+def extract_audio_group(input_files: List[Path]) -> None:
+    """
+    以單次 ffmpeg 呼叫 (多個輸入、各自輸出) 把多個小檔案轉檔到快取，靜音偵測結果一併存入快取
+    失敗時保留已完整寫出的檔案，其餘檔案之後逐檔處理時會自動改為單獨轉檔
+    """
+    targets = [(f, wav_cache_path(f)) for f in input_files]
+    targets = [(f, cached) for f, cached in targets if not cached.exists()]
+    if len(targets) < 2:
+        return
+
+    # 在快取目錄執行 ffmpeg，靜音偵測記錄檔只需用不含特殊字元的檔名，不必處理濾鏡語法的跳脫
+    cache_dir = Path(WAV_CACHE_DIR)
+    cmd = ['ffmpeg', '-y', '-v', 'error']
+    for input_file, _ in targets:
+        cmd += ['-i', os.path.abspath(input_file)]
+    for index, (_, cached_wav) in enumerate(targets):
+        filters = AUDIO_FILTERS
+        if SILENCE_TRIM:
+            # 各輸出分別偵測靜音，結果以 frame metadata 寫到各自的記錄檔
+            filters += (f',asetpts=PTS-STARTPTS,{silence_filter()}'
+                        f',ametadata=mode=print:file={cached_wav.stem}.silence.log')
+        cmd += [
+            '-map', f'{index}:a:0',
+            '-ar', '16000', '-ac', '1', '-c:a', 'pcm_s16le',
+            '-af', filters,
+            cached_wav.stem + '.partial.wav'
+        ]
+
     try:
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-        return True
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                       cwd=cache_dir, creationflags=SUBPROCESS_FLAGS)
     except subprocess.CalledProcessError as e:
-        print(f"  ❌ FFmpeg 錯誤: {e.stderr.decode('utf-8', errors='ignore')}")
+        # 通常是其中一個檔案損毀，不影響其他檔案，只提示原因
+        print(f"  ⚠️ 合併轉檔失敗，未完成的檔案改為逐檔轉檔: {ffmpeg_error_tail(e.stderr)}")
+
+    for _, cached_wav in targets:
+        partial_wav = cached_wav.with_suffix('.partial.wav')
+        silence_log = silence_log_path(cached_wav)
+        if not wav_is_complete(partial_wav):
+            remove_quietly(partial_wav, silence_log)
+            continue
+        if SILENCE_TRIM:
+            # 沒有任何靜音時 ametadata 不會建立記錄檔；改寫成含偵測設定的快取格式
+            log = silence_log.read_text(encoding='utf-8', errors='ignore') if silence_log.exists() else ''
+            save_silence_log(cached_wav, log)
+        os.replace(partial_wav, cached_wav)
+
+def silence_log_path(cached_wav: Path) -> Path:
+    """快取 WAV 對應的靜音偵測結果檔"""
+    return cached_wav.with_suffix('.silence.log')
+
+def load_silence_log(cached_wav: Path) -> Optional[str]:
+    """讀取快取的靜音偵測結果，不存在或偵測設定已變更時回傳 None"""
+    log_path = silence_log_path(cached_wav)
+    try:
+        text = log_path.read_text(encoding='utf-8')
+        os.utime(log_path)
+    except OSError:
+        return None
+    # 第一行記錄偵測時的濾鏡設定，調整 SILENCE_NOISE 等設定後需重新偵測
+    header, _, log = text.partition('\n')
+    return log if header == silence_filter() else None
+
+def save_silence_log(cached_wav: Path, log: str) -> None:
+    """把靜音偵測結果存到快取 WAV 旁，之後使用快取時不必再執行 ffmpeg"""
+    # 只保留靜音段落的記錄，先寫到暫存名稱避免中斷時留下不完整的結果
+    lines = [line for line in log.splitlines() if 'silence_' in line]
+    temp = silence_log_path(cached_wav).with_suffix('.tmp')
+    temp.write_text('\n'.join([silence_filter()] + lines), encoding='utf-8')
+    os.replace(temp, silence_log_path(cached_wav))
+
+def extract_audio_cached(input_file: Path) -> Tuple[Optional[Path], Optional[str]]:
+    """
+    提取音頻到快取目錄，檔案與濾鏡設定都沒變時直接重用上次的結果
+    Returns: (WAV 路徑, 靜音偵測輸出)；沒有可用的偵測結果時訊息為 None，失敗時路徑為 None
+    回傳的 WAV 在呼叫 release_cached_wav 前不會被 prune_wav_cache 刪除
+    """
+    cached_wav = wav_cache_path(input_file)
+    with WAV_CACHE_LOCK:
+        hit = cached_wav.exists()
+        if hit:
+            # 更新存取時間，供 prune_wav_cache 判斷最近使用
+            os.utime(cached_wav)
+            WAV_CACHE_IN_USE[cached_wav] += 1
+    if hit:
+        return cached_wav, load_silence_log(cached_wav) if SILENCE_TRIM else None
+
+    # 先寫到暫存名稱，避免中斷時留下不完整的快取
+    partial_wav = cached_wav.with_suffix('.partial.wav')
+    ffmpeg_log = extract_audio(input_file, partial_wav)
+    if ffmpeg_log is None:
+        remove_quietly(partial_wav)
+        return None, None
+    if SILENCE_TRIM:
+        save_silence_log(cached_wav, ffmpeg_log)
+    with WAV_CACHE_LOCK:
+        os.replace(partial_wav, cached_wav)
+        WAV_CACHE_IN_USE[cached_wav] += 1
+    return cached_wav, ffmpeg_log
+
+def release_cached_wav(cached_wav: Path) -> None:
+    """工作不再需要快取 WAV 時呼叫，之後清理快取時就可以刪除"""
+    with WAV_CACHE_LOCK:
+        WAV_CACHE_IN_USE[cached_wav] -= 1
+        if WAV_CACHE_IN_USE[cached_wav] <= 0:
+            del WAV_CACHE_IN_USE[cached_wav]
+
+def prune_wav_cache(startup: bool = False) -> None:
+    """
+    快取超過 WAV_CACHE_LIMIT 時，從最久未使用的檔案開始刪除 (WAV 與靜音偵測結果一起刪除)
+    執行中每批辨識完成後也會呼叫，略過仍在使用與正在寫入的檔案；
+    startup 時沒有進行中的轉檔，上次中斷留下的 .partial.wav 一併刪除
+    """
+    cache_dir = Path(WAV_CACHE_DIR)
+    if not cache_dir.is_dir():
+        return
+
+    with WAV_CACHE_LOCK:
+        entries = []
+        for wav in cache_dir.glob('*.wav'):
+            if wav.name.endswith('.partial.wav'):
+                if startup:
+                    remove_quietly(wav)
+                continue
+            try:
+                stat = wav.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, wav))
+        # 直接使用原檔的 WAV 只有靜音偵測結果，沒有對應的快取 WAV
+        for log in cache_dir.glob('*.silence.log'):
+            wav = log.with_suffix('').with_suffix('.wav')
+            try:
+                if not wav.exists():
+                    stat = log.stat()
+                    entries.append((stat.st_atime, stat.st_size, wav))
+            except OSError:
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, wav in sorted(entries):
+            if total <= WAV_CACHE_LIMIT:
+                break
+            if wav in WAV_CACHE_IN_USE:
+                continue
+            remove_quietly(wav, silence_log_path(wav))
+            total -= size
+
+def get_wav_duration(wav_file: Path) -> float:
+    """讀取 WAV 標頭取得音訊長度 (秒)，失敗時回傳 0"""
+    try:
+        with wave.open(str(wav_file), 'rb') as wav:
+            return wav.getnframes() / wav.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return 0.0
+
+def wav_is_ready(wav_file: Path) -> bool:
+    """檢查 WAV 是否已是 whisper.cpp 需要的 16kHz/16-bit 單聲道 PCM 格式"""
+    try:
+        with wave.open(str(wav_file), 'rb') as wav:
+            return wav.getframerate() == 16000 and wav.getnchannels() == 1 and wav.getsampwidth() == 2
+    except (OSError, EOFError, wave.Error):
         return False
 
-def run_whisper(wav_file: Path) -> bool:
-    """執行 whisper.cpp 生成字幕"""
+def wav_is_complete(wav_file: Path) -> bool:
+    """檢查 ffmpeg 是否已正常寫完 WAV (中斷時標頭的資料長度不會更新，與實際檔案大小不符)"""
+    try:
+        size = wav_file.stat().st_size
+        with wave.open(str(wav_file), 'rb') as wav:
+            data_size = wav.getnframes() * wav.getnchannels() * wav.getsampwidth()
+    except (OSError, EOFError, wave.Error):
+        return False
+    return 0 < data_size <= size
+
+def detect_silence(wav_file: Path) -> Optional[str]:
+    """對既有的 WAV 執行 ffmpeg silencedetect，回傳偵測輸出，失敗時回傳 None"""
     cmd = [
-        VALID_WHISPER_PATH,
-        '-m', MODEL_PATH,
-        '-f', str(wav_file),
-        '-l', 'zh',            
-        '--prompt', PROMPT_TEXT, 
-        '-osrt'                
+        'ffmpeg', '-hide_banner', '-nostats',
+        '-i', str(wav_file),
+        '-af', silence_filter(),
+        '-f', 'null', '-'
     ]
-    
+
     try:
-        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-        
-        # 檢查是否生成了預期的 .srt 檔案 (whisper.cpp 預設行為: input.wav -> input.wav.srt)
-        expected_srt = wav_file.with_suffix(wav_file.suffix + '.srt')
-        if expected_srt.exists():
-            return True
-        return False
-        
+        proc = subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                              creationflags=SUBPROCESS_FLAGS)
     except subprocess.CalledProcessError as e:
-        print(f"  ❌ Whisper 錯誤: {e.stderr.decode('utf-8', errors='ignore')}")
-        return False
+        print(f"  ❌ FFmpeg 錯誤: {ffmpeg_error_tail(e.stderr)}")
+        return None
+    return proc.stderr.decode('utf-8', errors='ignore')
 
-def process_single_file(video_path: Path, input_root: Path, output_root: Path) -> bool:
-    """處理單個檔案的完整流程"""
-    # 計算相對路徑
+def parse_speech(log: str, duration: float) -> Optional[List[Tuple[float, float]]]:
+    """
+    從 silencedetect 的輸出算出語音段落，沒有可裁剪的靜音時回傳 None
+    支援 ffmpeg 訊息 (silence_start: 1.2) 與 ametadata 記錄 (lavfi.silence_start=1.2) 兩種格式
+    """
+    # 取靜音段落的補集，靜音持續到結尾時不會有 silence_end
+    segments = []
+    cursor = 0.0
+    for kind, value in re.findall(r'silence_(start|end)(?:: |=)(-?[\d.]+)', log):
+        t = min(max(float(value), 0.0), duration)
+        if kind == 'start':
+            if t > cursor:
+                segments.append((cursor, t))
+            cursor = duration
+        else:
+            cursor = t
+    if cursor < duration:
+        segments.append((cursor, duration))
+
+    # 前後留白並合併重疊的段落
+    speech = []
+    for start, end in segments:
+        start, end = max(start - SPEECH_PADDING, 0.0), min(end + SPEECH_PADDING, duration)
+        if speech and start <= speech[-1][1]:
+            speech[-1] = (speech[-1][0], end)
+        else:
+            speech.append((start, end))
+
+    kept = sum(end - start for start, end in speech)
+    if not speech or duration - kept < SILENCE_MIN_DURATION:
+        return None
+    return speech
+
+def trim_wav(wav_file: Path, output_wav: Path, segments: List[Tuple[float, float]]) -> None:
+    """只保留語音段落，依取樣點精確裁切以確保時間軸可以還原"""
+    with wave.open(str(wav_file), 'rb') as reader, wave.open(str(output_wav), 'wb') as writer:
+        writer.setparams(reader.getparams())
+        rate = reader.getframerate()
+        for start, end in segments:
+            first, last = int(start * rate), min(int(end * rate), reader.getnframes())
+            reader.setpos(first)
+            writer.writeframes(reader.readframes(last - first))
+
+def to_original_time(t: float, segments: List[Tuple[float, float]]) -> float:
+    """把裁剪後音訊的時間換算回原始影片的時間"""
+    elapsed = 0.0
+    for start, end in segments:
+        if t <= elapsed + (end - start):
+            return start + (t - elapsed)
+        elapsed += end - start
+    return segments[-1][1] + (t - elapsed)
+
+def format_timestamp(seconds: float) -> str:
+    """秒數轉為 SRT 時間格式 (HH:MM:SS,mmm)"""
+    t = max(round(seconds * 1000), 0)
+    return f"{t // 3600000:02d}:{t // 60000 % 60:02d}:{t // 1000 % 60:02d},{t % 1000:03d}"
+
+def write_srt(srt_path: Path, segments: List[Tuple[float, float, str]]) -> None:
+    """把 (開始秒數, 結束秒數, 文字) 寫成 SRT 字幕檔"""
+    blocks = [
+        f"{index}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text.strip()}\n"
+        for index, (start, end, text) in enumerate(segments, 1)
+    ]
+    # 先寫到暫存檔再替換，中斷時不會留下不完整的字幕
+    temp = srt_path.with_suffix('.srt.tmp')
+    temp.write_text('\n'.join(blocks), encoding='utf-8')
+    os.replace(temp, srt_path)
+
+def remap_srt(src_path: Path, dst_path: Path, segments: List[Tuple[float, float]]) -> None:
+    """把暫存目錄中的字幕時間軸對回原始影片，寫到目標位置"""
+    def to_seconds(timestamp: str) -> float:
+        h, m, rest = timestamp.split(':')
+        sec, ms = rest.split(',')
+        return int(h) * 3600 + int(m) * 60 + int(sec) + int(ms) / 1000
+
+    def remap(match: re.Match) -> str:
+        start, end = (format_timestamp(to_original_time(to_seconds(t), segments)) for t in match.groups())
+        return f"{start} --> {end}"
+
+    # 只改寫「開始 --> 結束」的時間軸行，字幕內文中類似時間的字串保持不變
+    text = src_path.read_text(encoding='utf-8')
+    text = re.sub(r'^(\d{2,}:\d{2}:\d{2},\d{3}) --> (\d{2,}:\d{2}:\d{2},\d{3})[ \t]*$', remap, text, flags=re.M)
+    # 目標位置只會出現還原過時間軸的完整字幕，中斷時不會被下次執行當成已完成
+    temp = dst_path.with_suffix('.srt.tmp')
+    temp.write_text(text, encoding='utf-8')
+    os.replace(temp, dst_path)
+    remove_quietly(src_path)
+
+def run_with_stderr_tail(cmd: List[str]) -> Tuple[int, str]:
+    """執行子行程並只保留 stderr 最後幾行，長時間執行時不會在記憶體累積大量進度訊息"""
+    # stdout 已導向 DEVNULL，只讀一條管線不會互相卡住，不需要額外的讀取執行緒
+    with subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                          creationflags=SUBPROCESS_FLAGS) as proc:
+        tail = collections.deque(proc.stderr, maxlen=STDERR_TAIL_LINES)
+    return proc.returncode, b''.join(tail).decode('utf-8', errors='ignore')
+
+def run_whisper(jobs: List[AudioJob], processors: int = 1) -> bool:
+    """執行 whisper.cpp 生成字幕 (一次呼叫處理多個檔案，模型只需載入一次)"""
+    cmd = [
+        VALID_WHISPER_PATH,
+        '-m', VALID_MODEL_PATH,
+        '-l', 'zh',
+        '--prompt', PROMPT_TEXT,
+        '-osrt',
+        # 執行緒總數平均分給各個平行段落
+        '-p', str(processors),
+        '-t', str(max(1, WHISPER_THREADS // processors)),
+        '--beam-size', str(BEAM_SIZE),
+        '--best-of', str(BEST_OF),
+    ]
+    if NO_FALLBACK:
+        cmd.append('--no-fallback')
+    for job in jobs:
+        # -of 指定輸出檔名 (不含副檔名)；未裁剪的字幕直接寫到最終位置，裁剪過的先寫到暫存目錄
+        cmd += ['-f', str(job.wav_path), '-of', str(job.output_srt_path.with_suffix(''))]
+
+    returncode, stderr_tail = run_with_stderr_tail(cmd)
+    if returncode != 0:
+        print(f"  ❌ Whisper 錯誤: {stderr_tail}")
+        return False
+    return True
+
+def load_whisper_model() -> int:
+    """程式內辨識引擎：整個執行過程只載入一次模型，回傳模型數量"""
+    if WHISPER_BACKEND == 'faster-whisper':
+        import ctranslate2
+        from faster_whisper import BatchedInferencePipeline, WhisperModel
+
+        # 每張 GPU 各載入一個模型 (INT8 權重搭配 FP16 運算)，沒有 GPU 時以 INT8 在 CPU 執行
+        gpu_count = ctranslate2.get_cuda_device_count()
+        if gpu_count > 0:
+            models = [
+                WhisperModel(FASTER_WHISPER_MODEL, device='cuda', device_index=i, compute_type='int8_float16')
+                for i in range(gpu_count)
+            ]
+        else:
+            models = [
+                WhisperModel(FASTER_WHISPER_MODEL, device='cpu', compute_type='int8',
+                             cpu_threads=os.cpu_count() or 4)
+            ]
+        for model in models:
+            WHISPER_MODELS.put(BatchedInferencePipeline(model=model))
+        return len(models)
+
+    from pywhispercpp.model import Model
+    WHISPER_MODELS.put(Model(
+        VALID_MODEL_PATH,
+        params_sampling_strategy=0 if BEAM_SIZE <= 1 else 1,  # 0: greedy, 1: beam search
+        n_threads=os.cpu_count() or 4,
+        print_progress=False,
+        print_realtime=False,
+    ))
+    return 1
+
+def transcribe_segments(model, wav_file: Path) -> List[Tuple[float, float, str]]:
+    """以程式內模型辨識，回傳 (開始秒數, 結束秒數, 文字) 列表"""
+    if WHISPER_BACKEND == 'faster-whisper':
+        # 以 VAD 切出的語音片段為單位，一次推論 FASTER_WHISPER_BATCH_SIZE 段
+        # 批次推論預設 without_timestamps=True，每個最長 30 秒的片段只會得到一句字幕，
+        # 因此需明確開啟時間戳才能取得逐句的時間軸
+        segments, _ = model.transcribe(
+            str(wav_file),
+            batch_size=FASTER_WHISPER_BATCH_SIZE,
+            language='zh',
+            initial_prompt=PROMPT_TEXT,
+            beam_size=BEAM_SIZE,
+            best_of=BEST_OF,
+            temperature=0.0 if NO_FALLBACK else [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+            without_timestamps=False,
+            vad_filter=True,
+        )
+        # segments 是 generator，實際辨識在此時進行
+        return [(seg.start, seg.end, seg.text) for seg in segments]
+
+    segments = model.transcribe(
+        str(wav_file),
+        language='zh',
+        initial_prompt=PROMPT_TEXT,
+        greedy={'best_of': BEST_OF},
+        beam_search={'beam_size': BEAM_SIZE, 'patience': -1.0},
+        temperature_inc=0.0 if NO_FALLBACK else 0.2,
+    )
+    # pywhispercpp 的時間單位為 10 毫秒
+    return [(seg.t0 / 100, seg.t1 / 100, seg.text) for seg in segments]
+
+def transcribe_in_process(wav_file: Path, srt_path: Path) -> bool:
+    """從模型池取一個模型辨識單一檔案並寫出 SRT，用完放回讓其他 worker 使用"""
+    model = WHISPER_MODELS.get()
     try:
-        rel_path = video_path.relative_to(input_root)
-    except ValueError:
-        rel_path = video_path.name
-        
-    target_srt_path = output_root / rel_path.parent / f"{video_path.stem}.srt"
-    
-    # 檢查是否已存在
-    if target_srt_path.exists():
-        return False 
-        
-    # 建立輸出目錄
-    target_srt_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # 臨時 WAV 路徑 (放在輸出目錄，處理完刪除)
-    temp_wav = target_srt_path.parent / f"{video_path.stem}_temp.wav"
-    temp_srt_generated = temp_wav.with_suffix('.wav.srt') 
-    
-    result = False
+        segments = transcribe_segments(model, wav_file)
+    except Exception as e:
+        print(f"  ❌ Whisper 錯誤: {e}")
+        return False
+    finally:
+        WHISPER_MODELS.put(model)
+
+    write_srt(srt_path, segments)
+    return True
+
+def remove_quietly(*paths: Path) -> None:
+    """刪除臨時檔案，忽略任何錯誤"""
+    for temp in paths:
+        if temp.exists():
+            try: os.remove(temp)
+            except: pass
+
+def prepare_audio(video_path: Path, target_srt_path: Path, staging_dir: Path, index: int) -> Optional[AudioJob]:
+    """第一階段：取得 16kHz 音頻並裁剪靜音，失敗時回傳 None"""
+    # 加上序號避免不同子目錄的同名檔案互相覆蓋
+    speech_wav = staging_dir / f"{index:05d}_{video_path.stem}_speech.wav"
+    cache_wav = None
+
     try:
-        # 1. 提取音頻
-        if extract_audio(video_path, temp_wav):
-            # 2. 生成字幕
-            if run_whisper(temp_wav):
-                # 3. 移動並重新命名
-                if temp_srt_generated.exists():
-                    shutil.move(str(temp_srt_generated), str(target_srt_path))
-                    result = True
-                else:
-                    print(f"  ❌ 未找到生成的字幕檔")
+        if video_path.suffix.lower() == '.wav' and wav_is_ready(video_path):
+            # 已符合格式的 WAV 直接使用原檔，省下 ffmpeg 轉檔 (不套用 AUDIO_FILTERS)
+            # 靜音偵測結果仍存在快取目錄，重新執行時完全不需要 ffmpeg
+            wav_path = video_path
+            silence_key = wav_cache_path(video_path)
+            ffmpeg_log = load_silence_log(silence_key) if SILENCE_TRIM else None
+        else:
+            wav_path, ffmpeg_log = extract_audio_cached(video_path)
+            if wav_path is None:
+                return None
+            cache_wav = silence_key = wav_path
+
+        # 原始 WAV 與快取檔都要保留，只有裁剪後的檔案是暫存檔
+        job = AudioJob(video_path, wav_path, target_srt_path, temporary=False, cache_wav=cache_wav)
+        if SILENCE_TRIM:
+            # 轉檔時已在同一次 ffmpeg 偵測過靜音 (結果與快取一起保存)，沒有結果時才另外讀一次 WAV
+            if ffmpeg_log is None:
+                ffmpeg_log = detect_silence(wav_path)
+                if ffmpeg_log is not None:
+                    save_silence_log(silence_key, ffmpeg_log)
+            segments = None if ffmpeg_log is None else parse_speech(ffmpeg_log, get_wav_duration(wav_path))
+            if segments:
+                trim_wav(wav_path, speech_wav, segments)
+                job.wav_path, job.speech_segments, job.temporary = speech_wav, segments, True
+                # 辨識改用裁剪後的檔案，快取 WAV 已不需要保留到辨識結束
+                if cache_wav is not None:
+                    release_cached_wav(cache_wav)
+                    job.cache_wav = cache_wav = None
+        return job
     except Exception as e:
         print(f"  ❌ 處理異常: {e}")
-    finally:
-        # 清理臨時檔案
-        for temp in [temp_wav, temp_srt_generated]:
-            if temp.exists():
-                try: os.remove(temp)
-                except: pass
 
-    return result
+    if cache_wav is not None:
+        release_cached_wav(cache_wav)
+    remove_quietly(speech_wav)
+    return None
+
+def transcribe_batch(jobs: List[AudioJob]) -> List[bool]:
+    """第二階段：整批音頻交給單一 whisper.cpp 行程，裁剪過的字幕還原時間軸後再放到目標位置"""
+    if not jobs:
+        return []
+
+    for job in jobs:
+        job.target_srt_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if WHISPER_BACKEND != 'cli':
+        for job in jobs:
+            transcribe_in_process(job.wav_path, job.output_srt_path)
+    else:
+        # 長音檔各自以多段平行處理，其餘檔案共用一次呼叫
+        short_jobs = []
+        for job in jobs:
+            if WHISPER_PROCESSORS > 1 and get_wav_duration(job.wav_path) > PARALLEL_MIN_DURATION:
+                run_whisper([job], WHISPER_PROCESSORS)
+            else:
+                short_jobs.append(job)
+
+        # 即使 whisper.cpp 回傳錯誤，前面的檔案可能已完成，因此逐一檢查輸出
+        if short_jobs:
+            run_whisper(short_jobs)
+
+    results = []
+    for job in jobs:
+        result = False
+        try:
+            if job.output_srt_path.exists():
+                if job.speech_segments:
+                    remap_srt(job.output_srt_path, job.target_srt_path, job.speech_segments)
+                result = True
+            else:
+                print(f"  ❌ 未找到生成的字幕檔: {job.video_path.name}")
+        except Exception as e:
+            print(f"  ❌ 處理異常: {e}")
+        finally:
+            if job.speech_segments:
+                remove_quietly(job.output_srt_path)
+            if job.temporary:
+                remove_quietly(job.wav_path)
+            if job.cache_wav is not None:
+                release_cached_wav(job.cache_wav)
+        results.append(result)
+
+    return results
+
+def extract_batches(tasks: List[Tuple[Path, Path, int]], input_root: Path, staging_dir: Path, batch_size: int,
+                    batches: queue.Queue, stop: threading.Event) -> None:
+    """生產者：逐批提取音頻放入佇列，讓 ffmpeg 與 whisper.cpp 同時工作"""
+    try:
+        for start in range(0, len(tasks), batch_size):
+            batch = tasks[start:start + batch_size]
+
+            # 小檔案先合併轉檔到快取，之後逐檔處理時就會直接使用快取
+            small_files = [
+                video_file for video_file, _, size in batch
+                if size < SMALL_FILE_SIZE
+                and not (video_file.suffix.lower() == '.wav' and wav_is_ready(video_file))
+            ]
+            for group_start in range(0, len(small_files), EXTRACT_GROUP_SIZE):
+                if stop.is_set():
+                    return
+                extract_audio_group(small_files[group_start:group_start + EXTRACT_GROUP_SIZE])
+
+            jobs, failed = [], []
+            for index, (video_file, dest_srt, _) in enumerate(batch, start):
+                if stop.is_set():
+                    return
+                if not TQDM_AVAILABLE:
+                    print(f"正在提取音頻: {video_file.relative_to(input_root)}")
+                job = prepare_audio(video_file, dest_srt, staging_dir, index)
+                if job is None:
+                    failed.append(video_file)
+                else:
+                    jobs.append(job)
+            batches.put((jobs, failed))
+    finally:
+        # 結束標記，通知主執行緒不會再有新的批次 (主執行緒已停止讀取時不需要)
+        if not stop.is_set():
+            batches.put(None)
 
 def main():
     print("=" * 60)
@@ -202,16 +882,10 @@ def main():
 
     # 掃描檔案
     print("\n🔍 正在掃描影片檔案...")
-    tasks = []
-    for root, _, files in os.walk(input_root):
-        for file in files:
-            file_path = Path(root) / file
-            if file_path.suffix.lower() in SUPPORTED_EXTENSIONS:
-                # 檢查是否已存在字幕
-                rel_p = file_path.relative_to(input_root)
-                dest_srt = output_root / rel_p.parent / f"{file_path.stem}.srt"
-                if not dest_srt.exists():
-                    tasks.append(file_path)
+    tasks = collect_video_files(input_root, output_root)
+
+    # 以檔案大小估計長度，先處理最長的檔案，多個 worker 的總完成時間較短
+    tasks.sort(key=lambda task: task[2], reverse=True)
 
     total_tasks = len(tasks)
     if total_tasks == 0:
@@ -220,26 +894,88 @@ def main():
 
     print(f"📊 待處理影片數: {total_tasks}\n")
 
+    # 程式內引擎每個模型同時只辨識一個檔案，worker 數等於模型數 (多張 GPU 時每張一個)
+    # 在建立暫存目錄與進度條之前載入，載入失敗時不會留下任何暫存檔
+    if WHISPER_BACKEND == 'cli':
+        workers = WHISPER_WORKERS
+    else:
+        print("⏳ 正在載入模型...")
+        try:
+            workers = load_whisper_model()
+        except Exception as e:
+            print(f"❌ 錯誤: 無法載入模型 ({WHISPER_BACKEND}): {e}")
+            sys.exit(1)
+
     success_count = 0
     fail_count = 0
 
     # 進度條處理
-    iterator = tqdm(tasks, unit="片", ncols=80) if TQDM_AVAILABLE else tasks
-    
-    for video_file in iterator:
-        rel_name = video_file.relative_to(input_root)
-        
-        if not TQDM_AVAILABLE:
-            print(f"正在處理: {rel_name} ...", end="", flush=True)
+    progress = tqdm(total=total_tasks, unit="片", ncols=80) if TQDM_AVAILABLE else None
 
-        is_success = process_single_file(video_file, input_root, output_root)
-        
+    def report(video_file: Path, is_success: bool) -> None:
+        nonlocal success_count, fail_count
         if is_success:
             success_count += 1
-            if not TQDM_AVAILABLE: print(" ✅ 完成")
         else:
             fail_count += 1
-            if not TQDM_AVAILABLE: print(" ❌ 失敗")
+        if progress is not None:
+            progress.update(1)
+        else:
+            status = "✅ 完成" if is_success else "❌ 失敗"
+            print(f"{video_file.relative_to(input_root)} {status}")
+
+    prune_wav_cache(startup=True)
+
+    # 暫存音頻的目錄 (與輸出目錄分開)，全部處理完後刪除
+    Path(TEMP_DIR).mkdir(parents=True, exist_ok=True)
+    staging_dir = Path(tempfile.mkdtemp(prefix='subtitle_', dir=TEMP_DIR))
+
+    # 檔案不多時縮小批次，讓每個 whisper.cpp 行程都分得到工作
+    batch_size = max(1, min(WHISPER_BATCH_SIZE, -(-total_tasks // workers)))
+
+    # 佇列只保留一批已提取的音頻，避免暫存目錄無限制膨脹
+    batches = queue.Queue(maxsize=1)
+    stop = threading.Event()
+
+    try:
+        with ThreadPoolExecutor(max_workers=1) as extractor, \
+                ThreadPoolExecutor(max_workers=workers) as transcriber:
+            producer = extractor.submit(
+                extract_batches, tasks, input_root, staging_dir, batch_size, batches, stop)
+            running = {}
+            extracting = True
+            try:
+                while extracting or running:
+                    # 有空閒的 whisper.cpp 行程時才取下一批，其餘時間提取執行緒在背景準備
+                    if extracting and len(running) < workers:
+                        item = batches.get()
+                        if item is None:
+                            extracting = False
+                            continue
+                        jobs, failed = item
+                        for video_file in failed:
+                            report(video_file, False)
+                        running[transcriber.submit(transcribe_batch, jobs)] = jobs
+                        continue
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        jobs = running.pop(future)
+                        for job, is_success in zip(jobs, future.result()):
+                            report(job.video_path, is_success)
+                        # 每批完成後就清理快取，避免單次處理大量影片時超過容量上限
+                        prune_wav_cache()
+            finally:
+                # 中途離開時通知提取執行緒停止，並清空佇列讓它不會卡在 put
+                stop.set()
+                while True:
+                    try: batches.get_nowait()
+                    except queue.Empty: break
+            producer.result()
+    finally:
+        if progress is not None:
+            progress.close()
+        shutil.rmtree(staging_dir, ignore_errors=True)
 
     print("\n" + "=" * 60)
     print(f"🏁 處理完成")